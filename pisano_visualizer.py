@@ -13,17 +13,34 @@
 
 
 import pygame, math, os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# NumPy and Numba are optional: without them the core loop runs as
+# plain Python and the bars are drawn one rect at a time
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 # --- Config ---
 INIT_WIDTH = 1000
 HEIGHT = 400
 MARGIN = 100
 GRAPH_WIDTH = 800
+MAX_WIDTH = 2 * GRAPH_WIDTH + 100   # fits every graph of up to 800 bars (m <= 133)
 
 pygame.init()
 
 # --- Setup main window ---
-screen = pygame.display.set_mode((INIT_WIDTH, HEIGHT))
+# created once; each modulus is drawn into view_rect, centered in the window
+screen = pygame.display.set_mode((MAX_WIDTH, HEIGHT))
+view_rect = screen.get_rect()
 pygame.display.set_caption("Pisano Visualizer")
 
 # --- Info window state ---
@@ -33,6 +50,8 @@ info_surface = pygame.Surface((500, 300))  # size of info box
 # --- Setup fonts ---
 font = pygame.font.SysFont(None, 30)
 info_font = pygame.font.SysFont(None, 22)
+title_font = pygame.font.SysFont(None, 36)     # bigger for title
+subtitle_font = pygame.font.SysFont(None, 24)  # smaller for subtitle
 
 # --- Ensure folders exist ---
 os.makedirs("Images", exist_ok=True)
@@ -40,86 +59,87 @@ os.makedirs("Scores", exist_ok=True)
 os.makedirs("Textfiles", exist_ok=True)
 
 # --- Core math ---
-def pisano_list(m, cap=100000):
-    seq = []
+def _pisano_core(m, out):
+    # fills out with F1 ... F(length) mod m, returns (length, sections, mirror)
+    # sections counts the zeros, mirror counts the [1, m-1, 0] markers
+    # announcing the mirrored 2nd half
+    n = 0
+    sections = 0
+    mirror = 0
     a, b = 1, 0
-    for _ in range(1, cap + 1):
-        a, b = b, (a + b) % m
-        seq.append(b)
-        if a == 1 and b == 0:
-            break
-    return seq
+    while n < len(out):
+        d = (a + b) % m
+        out[n] = d
+        n += 1
+        if d == 0:
+            # the period and the mirror can only end on a zero
+            sections += 1
+            if a == 1 and b == m - 1:
+                mirror += 1
+            if b == 1:
+                break
+        a, b = b, d
+    return n, sections, mirror
+
+if njit is not None:
+    _pisano_core = njit(cache=True, boundscheck=False)(_pisano_core)
+
+@lru_cache(maxsize=512)
+def pisano_info(m):
+    # one pass over a full period: returns (seq, length, sections, mirror)
+    # the period never exceeds 6m (Freyd & Brown, Amer. Math. Monthly 1992),
+    # so a buffer of 6m + 4 always holds it
+    cap = 6 * m + 4
+    if njit is not None:
+        out = np.empty(cap, np.int64)
+    else:
+        out = [0] * cap
+    n, sections, mirror = _pisano_core(m, out)
+    return tuple(map(int, out[:n])), n, sections, mirror
+
+def pisano_list(m):
+    return list(pisano_info(m)[0])
 
 def pisano_mirror(m):
-    a, b, c = 0, 1, 2
-    mirror = 0
-    mirror_seq = [1, m - 1, 0]
-    ex_seq = [m - 1, 1, 0]
-    while c <= 100000:
-        d = (a + b) % m
-        end_seq = [a, b, d]
-        a, b, c = b, d, c + 1
-        if end_seq == mirror_seq:
-            mirror += 1
-        if end_seq == ex_seq:
-            break
-    return mirror
+    return pisano_info(m)[3]
 
 def pisano_length(m):
-    psl = [1]
-    a,b,c = 0,1,2
-    end_seq = [1,1,2]
-    ex_seq = [m-1, 1, 0]
-    while c <= 100000:
-        d = (a+b) % m
-        end_seq = [a,b,d]
-        a,b,c = b,d,c+1
-        psl.append(d)
-        if end_seq == ex_seq:
-            break
-    return c-1
+    return pisano_info(m)[1]
 
 def pisano_sections(m):
-    psl = [1]
-    a,b,c = 0,1,2
-    z = 0
-    end_seq = [1,1,2]
-    ex_seq = [m-1, 1, 0]
-    while c <= 100000:
-        d = (a+b) % m
-        if d == 0:
-            z = z+1
-        end_seq = [a,b,d]
-        a,b,c = b,d,c+1
-        psl.append(d)
-        if end_seq == ex_seq:
-            break
-    return z
+    return pisano_info(m)[2]
 
 # --- Create title ---
 def title_text(m):
     # Simple, clean title
     return f"Pisano {m}"
 
-def subtitle_text(m):
-    length = pisano_length(m)
-    sect = pisano_sections(m)
+def subtitle_text(m, mirror, length, sect):
     st = f"Fibonacci 1-{length} mod {m}"
     st += f" ({sect}*{int(length/sect)}"
-    if pisano_mirror(m) > 0:
+    if mirror > 0:
         st += " notes with mirrored 2nd half)"
     else:
         st += " notes)"
     return st
 
 # --- Drawing ---
-def draw_pisano(m):
-    global screen
-    seq = pisano_list(m)
-    n = len(seq)
-    if n == 0:
-        screen.fill((255,255,255))
-        return
+@lru_cache(maxsize=256)
+def _render_headers(m, mirror, length, sect):
+    text = title_font.render(title_text(m), True, (0, 0, 0))
+    subtext = subtitle_font.render(subtitle_text(m, mirror, length, sect), True, (100, 100, 100))
+    return text, subtext
+
+@lru_cache(maxsize=64)
+def _bar_slices(n, bar_width, spacing):
+    # pixel columns of each bar, shared by every modulus with the same bar layout
+    step = bar_width + spacing
+    return tuple(slice(x, x + bar_width) for x in range(0, n * step, step))
+
+@lru_cache(maxsize=64)
+def _render_graph(m):
+    # the bargraph of one period, drawn once per modulus on its own surface
+    seq, n, _, mirror_flag = pisano_info(m)
 
     max_val = max(seq) if seq else 1
     spacing = 0 if n > 69 else 1
@@ -128,55 +148,79 @@ def draw_pisano(m):
 
     # Compute actual graph width from number of bars
     graph_width = n * (bar_width + spacing) - spacing
+    graph_height = HEIGHT - 2 * MARGIN + 70
+
+    graph = pygame.Surface((graph_width, graph_height), 0, 32)
+    graph.fill((255, 255, 255))
+
+    mid = n // 2 if (mirror_flag >= 1 and n % 2 == 0) else None
 
-    # Window width = graph width + 100 pixels margin
+    # grey for even / odd sections, a bit more blue (+0.2 * 255) for the
+    # mirrored half, black for the zeros
+    palette = [(150, 150, 150), (100, 100, 100), (150, 150, 201), (100, 100, 151), (0, 0, 0)]
+
+    if np is not None:
+        # Bar geometry and colors for the whole period at once,
+        # written straight into the graph's pixel array
+        vals = np.asarray(seq)
+        zeros = vals == 0
+        heights = np.where(zeros, 3, (vals / max_val * graph_height).astype(np.int64))
+        ys = (graph_height - heights).tolist()
+
+        idx = np.cumsum(zeros) & 1
+        if mid is not None:
+            idx[mid:] |= 2
+        idx[zeros] = 4
+        colors = np.array([graph.map_rgb(c) for c in palette])[idx].tolist()
+
+        # every bar runs from its top down to the bottom edge of the graph
+        pixels = pygame.surfarray.pixels2d(graph)
+        for columns, y, color in zip(_bar_slices(n, bar_width, spacing), ys, colors):
+            pixels[columns, y:] = color
+        del pixels
+    else:
+        section = 0
+        for i, val in enumerate(seq):
+            if val == 0:
+                section += 1
+            h = 3 if val == 0 else int((val / max_val) * graph_height)
+            x = i * (bar_width + spacing)
+            y = graph_height - h
+
+            idx = 4 if val == 0 else ((section & 1) | (2 if (mid is not None and i >= mid) else 0))
+            pygame.draw.rect(graph, palette[idx], (x, y, bar_width, h))
+
+    return graph
+
+def draw_pisano(m):
+    global screen, view_rect
+    _, n, sect, mirror_flag = pisano_info(m)
+    if n == 0:
+        screen.fill((255,255,255))
+        return
+
+    graph = _render_graph(m)
+    graph_width, graph_height = graph.get_size()
+
+    # View width = graph width + 100 pixels margin,
+    # the window only grows for graphs wider than MAX_WIDTH
     new_width = max(INIT_WIDTH, graph_width + 100)
-    if screen.get_width() != new_width or screen.get_height() != HEIGHT:
+    if screen.get_width() < new_width:
         screen = pygame.display.set_mode((new_width, HEIGHT))
+    view_rect = pygame.Rect((screen.get_width() - new_width) // 2, 0, new_width, HEIGHT)
 
     screen.fill((255, 255, 255))
 
-     # Define fonts once at the top
-    title_font = pygame.font.SysFont(None, 36, bold=False)     # bigger for title
-    subtitle_font = pygame.font.SysFont(None, 24, bold=False)  # smaller for subtitle
-
-    # --- In draw_pisano ---
-    # Title centered
-    title = title_text(m)
-    text = title_font.render(title, True, (0, 0, 0))
-    text_rect = text.get_rect(center=(new_width // 2, 32))
-    screen.blit(text, text_rect)
-
-    # Subtitle just below, smaller and grey
-    subtitle = subtitle_text(m)
-    subtext = subtitle_font.render(subtitle, True, (100, 100, 100))
-    subtext_rect = subtext.get_rect(center=(new_width // 2, 55))
-    screen.blit(subtext, subtext_rect)
-
-    # Center graph horizontally
-    start_x = (new_width - graph_width) // 2
-    graph_height = HEIGHT - 2 * MARGIN + 70
-
-    section = 0
-    mirror_flag = pisano_mirror(m)
-    mid = n // 2 if (mirror_flag >= 1 and n % 2 == 0) else None
-
-    for i, val in enumerate(seq):
-        if val == 0:
-            section += 1
-        h = 3 if val == 0 else int((val / max_val) * graph_height)
-        x = start_x + i * (bar_width + spacing)
-        y = HEIGHT + 60- MARGIN - h
+    # Title centered, subtitle just below, smaller and grey
+    text, subtext = _render_headers(m, mirror_flag, n, sect)
+    screen.blit(text, text.get_rect(center=(view_rect.centerx, 32)))
+    screen.blit(subtext, subtext.get_rect(center=(view_rect.centerx, 55)))
 
-        color = (150, 150, 150) if section % 2 == 0 else (100, 100, 100)
-        if val == 0:
-            color = (0, 0, 0)
-        if mid is not None and i >= mid and val != 0:
-            r, g, b = color
-            color = (r, g, min(255, int(b + 0.2 * 255)))
+    # Center graph horizontally, bars standing on the same baseline as before
+    start_x = view_rect.x + (new_width - graph_width) // 2
+    screen.blit(graph, (start_x, HEIGHT + 60 - MARGIN - graph_height))
 
-        pygame.draw.rect(screen, color, (x, y, bar_width, h))
-        pygame.display.flip()
+    pygame.display.flip()
 
 
 # --- Lilypond score generator ---
@@ -198,100 +242,76 @@ notes = [
 def signature(length,counter):
     # find out the time signature fitting with the length of the loop
     # longest mesure we want to use is counter/4
-
-    # initialize a float and an integer value for comparison
-    mf = 0.
-    mi = 0
-    tsig = ""
-
     while counter > 1:
-        mf = length/counter
-        mi = int(length/counter)
-
-        if mf == mi:
+        if length % counter == 0:
             return counter        # number of notes per mesure
-            break
         counter = counter-1
 
+# clef for every note index of the notes list above
+clefs = ["bass_15"]*12 + ["bass_8"]*12 + ["bass"]*24 + ["treble"]*26 + ["treble^8"]*35   # 0 - 108
+
+# transposition (in semitones) for every modulus, the last one covers all m > 60
+transpositions = [48]*25 + [36]*24 + [24]*12 + [12]   # 0 - 61
+
 def transposition(m):
-    if m < 25:
-        t = 48
-    if m > 24 and m < 49:
-        t = 36
-    if m > 48 and m < 61:
-        t = 24
-    if m > 60:
-        t = 12
-    return t
+    return transpositions[min(m, len(transpositions)-1)]
 
 def clef(note):
-    clef_name = ""
-    if note > 73:
-        clef_name = "treble^8"
-    if note > 47 and note <= 73:
-        clef_name = "treble"
-    if note > 23 and note <= 47:
-        clef_name = "bass"
-    if note > 11 and note <= 23:
-        clef_name = "bass_8"
-    if note <= 11:
-        clef_name = "bass_15"
-    return clef_name
+    return clefs[min(note, len(clefs)-1)]
 
 def pisano_score(m, file, ocr):
     # analyse series in order to obtain all data to be used for the score
 
     # initialize variables
-    length = pisano_length(m)
+    _, length, _, mirror = pisano_info(m)
     a,b,c = 0,1,2
     z = 1
-    end_seq = [1,1,2]
-    ex_seq = [m-1, 1, 0]
     new_sect = 0
     d_old = 1
     old_clef = " "
     barcounter = 1
+    tsig = signature(length,7)
 
-    pf = open(file,'w')
+    parts = []
+    app = parts.append
 
     # page settings
-    pf.write('''\\paper {'''+"\r")
-    pf.write('''  top-margin = 15'''+"\r")
-    pf.write('''  left-margin = 15'''+"\r")
-    pf.write('''  right-margin = 15'''+"\r")
-    pf.write('''  indent = 0'''+"\r")
-    pf.write('''  }'''+"\r")
-    pf.write('''\\version "2.18.2-1"'''+"\r")
+    app('''\\paper {'''+"\n")
+    app('''  top-margin = 15'''+"\n")
+    app('''  left-margin = 15'''+"\n")
+    app('''  right-margin = 15'''+"\n")
+    app('''  indent = 0'''+"\n")
+    app('''  }'''+"\n")
+    app('''\\version "2.18.2-1"'''+"\n")
 
     # create LilyPond header
-    pf.write('''\\header{'''+"\r")
-    pf.write('''   title = "Pisano Melody '''+str(m)+'''"'''+"\r")
+    app('''\\header{'''+"\n")
+    app('''   title = "Pisano Melody '''+str(m)+'''"'''+"\n")
     subtit = '''   subtitle = "Fibonacci 1-'''+str(length)+" mod "+str(m)
     subtit = subtit + ''' ( ''' + str(z)+" * "+str(int(length/z))
-    if pisano_mirror(m) > 0:
+    if mirror > 0:
         subtit = subtit + ''' notes with mirrored 2nd half )"'''
     else:
         subtit = subtit + ''' notes )"'''
-    pf.write(subtit+"\r")
-    pf.write('''   poet = "Coded in Python"'''+"\r")
-    pf.write('''   composer = "Arthur Stammet"'''+"\r")
-    pf.write('''   opus = "2019"'''+"\r")
-    pf.write('''   }'''+"\r")
-    pf.write('''{'''+"\r")
+    app(subtit+"\n")
+    app('''   poet = "Coded in Python"'''+"\n")
+    app('''   composer = "Arthur Stammet"'''+"\n")
+    app('''   opus = "2019"'''+"\n")
+    app('''   }'''+"\n")
+    app('''{'''+"\n")
     # write time signature, bars and notes with supplementary informations
-    # tsig = signature(length,7)
-    pf.write('''\\time '''+str(signature(length,7))+'''/4 \r''')
-    pf.write('''\\bar ".|:"'''+"\r")
+    app('''\\time '''+str(tsig)+'''/4 \n''')
+    app('''\\bar ".|:"'''+"\n")
 
     bt = b+transposition(m)
     if clef(bt) != old_clef:
-        pf.write('''\\clef "'''+clef(bt)+'''" ''')
+        app('''\\clef "'''+clef(bt)+'''" ''')
         old_clef = clef(bt)
-        pf.write(str(notes[bt]))
+        app(str(notes[bt]))
         if ocr == 0:
-            pf.write('''-1'''+"\r")
-            pf.write('''^"Section 1"''')
-        pf.write("\r")
+            app('''-1'''+"\n")
+            app('''^"Section 1"''')
+        app("\n")
     while c <= length:
         d = (a+b) % m
         if d_old == 0:
@@ -303,41 +323,56 @@ def pisano_score(m, file, ocr):
         a,b,c = b,d,c+1
         bt = b+transposition(m)
         if clef(bt) != old_clef:
-            pf.write('''\\clef "'''+clef(bt)+'''" ''')
+            app('''\\clef "'''+clef(bt)+'''" ''')
             old_clef = clef(bt)
-        pf.write(str(notes[bt]))
+        app(str(notes[bt]))
         if ocr == 0:
-            pf.write('''-'''+str(pos))
-        pf.write(" \r")
+            app('''-'''+str(pos))
+        app(" \n")
         if ocr == 0:
             if new_sect == 1:
-                pf.write('''^"Section '''+str(z)+'''" \r''')
+                app('''^"Section '''+str(z)+'''" \n''')
                 if pos-1 == length/2:
-                    if pisano_mirror(m) > 0:
-                        pf.write('''^"Begin of mirror"'''+"\r")
+                    if mirror > 0:
+                        app('''^"Begin of mirror"'''+"\n")
 
         barcounter = barcounter+1
         d_old = d
-        if barcounter % signature(length,7) == 0:
-                pf.write('''|'''+"\r")
+        if barcounter % tsig == 0:
+                app('''|'''+"\n")
 
-    pf.write('''\\bar ":|."'''+"\r")
-    pf.write('}')
+    app('''\\bar ":|."'''+"\n")
+    app('}')
 
-    pf.close()
+    with open(file,'w') as pf:
+        pf.write("".join(parts))
 
 # --- Save functions ---
 os.makedirs("Textfiles", exist_ok=True)
 os.makedirs("Images", exist_ok=True)
 os.makedirs("Scores", exist_ok=True)
 
-def save_snapshot(m):
-    # Scale the current screen surface by 3x
-    scaled_surface = pygame.transform.scale(
-        screen, (screen.get_width() * 3, screen.get_height() * 3))
+# Saving runs on a worker thread so the window keeps responding;
+# a single worker keeps saves in order and never writes one file twice at once
+_io_pool = ThreadPoolExecutor(max_workers=1)
+
+def _report_error(future):
+    if future.exception() is not None:
+        print(f"Saving failed: {future.exception()}")
+
+def save_in_background(save, *args):
+    _io_pool.submit(save, *args).add_done_callback(_report_error)
+
+def snapshot_view():
+    # copy of the visible graph area, taken on the main thread
+    # so the worker never reads the screen while it is redrawn
+    return screen.subsurface(view_rect).copy()
+
+def save_snapshot(m, view):
+    # PNG is lossless, so the view is saved at its native size
     fname = os.path.join("Images", f"Pisano {m}.png")
-    pygame.image.save(scaled_surface, fname)
-    print(f"Saved image (3x bigger): {fname}")
+    pygame.image.save(view, fname)
+    print(f"Saved image: {fname}")
 
 def save_score(m):
     fname = os.path.join("Scores", f"Pisano Melody {m}.ly")
@@ -345,22 +380,17 @@ def save_score(m):
     print(f"Saved score: {fname}")
 
 def save_text(m):
-    seq = pisano_list(m)
-    length = len(seq)
+    seq, length, sect, mirror = pisano_info(m)
     titleline = title_text(m)
-    subtitleline = subtitle_text(m)
+    subtitleline = subtitle_text(m, mirror, length, sect)
     fname = os.path.join("Textfiles", f"Pisano {m}.txt")
     with open(fname, "w") as f:
-        # Title lines (lines 1-2)
-        f.write(f"{titleline}\n")
-        f.write(f"{subtitleline}\n")
-
-        # Number of steps (line 3)
-        f.write(f"{length}\n")
+        # Title lines (lines 1-2), number of steps (line 3)
+        f.write(f"{titleline}\n{subtitleline}\n{length}\n")
 
         # Sequence values, one per line (lines 4-...)
-        for val in seq:
-            f.write(f"{val}\n")
+        f.write("\n".join(map(str, seq)))
+        f.write("\n")
     print(f"Saved text file: {fname}")
 
 
@@ -369,10 +399,11 @@ def main():
     m = 13
     draw_pisano(m)
     running = True
-    clock = pygame.time.Clock()
 
     while running:
-        for event in pygame.event.get():
+        # sleep until something happens, nothing is animated between events
+        events = [pygame.event.wait()] + pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
 
@@ -388,11 +419,11 @@ def main():
                 elif event.key == pygame.K_DOWN:
                     m = max(3, m - 10); draw_pisano(m)
                 elif event.key == pygame.K_t:
-                    save_text(m)
+                    save_in_background(save_text, m)
                 elif event.key == pygame.K_s:
-                    save_snapshot(m)
+                    save_in_background(save_snapshot, m, snapshot_view())
                 elif event.key == pygame.K_l:
-                    if m < 98: save_score(m)
+                    if m < 98: save_in_background(save_score, m)
                 elif event.key == pygame.K_1:
                     m = 10
                     draw_pisano(m)
@@ -429,11 +460,11 @@ def main():
 
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # left click
-                    if m < 98: save_score(m)
-                    save_snapshot(m)
-                    save_text(m)
+                    if m < 98: save_in_background(save_score, m)
+                    save_in_background(save_snapshot, m, snapshot_view())
+                    save_in_background(save_text, m)
 
-        clock.tick(60)
+    _io_pool.shutdown(wait=True)  # let pending saves finish
     pygame.quit()
 
 if __name__ == "__main__":